@@ -9,25 +9,116 @@ inventory that can be used for further configuration.
 """
 
 import argparse
-import atexit
+import json
 import logging as log
-import pycdlib
+import os
 import shutil
 import sys
-import tempfile
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from itertools import repeat
 from jinja2 import Template
-from json import dumps
-from subprocess import call
-from time import sleep
-from re import sub
-from requests import delete, get, post, put
+from subprocess import DEVNULL, PIPE, run
+from tempfile import TemporaryDirectory
+from threading import Lock
+from time import sleep, time
+from re import compile as re_compile
+from requests import RequestException, Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import JSONDecodeError as RequestsJSONDecodeError
 from urllib.parse import urlparse
+from urllib3.util.retry import Retry
 from yaml import load, safe_dump
+try:
+    import pycdlib
+except ImportError:
+    pycdlib = None
 try:
     from yaml import CLoader as Loader
 except ImportError:
     from yaml import Loader
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
+
+
+class GNS3Error(Exception):
+    """
+    Raised when the topology cannot be deployed, e.g. because the GNS3 server
+    returned an error. Takes a logging style message and its arguments.
+    """
+
+    def __str__(self):
+        if not self.args:
+            return ""
+
+        # Like logging, only format the message if there are arguments
+        message, *args = self.args
+        return str(message) % tuple(args) if args else str(message)
+
+
+class GNS3Retry(Retry):
+    """
+    Retry policy that also retries requests rejected with HTTP 429, whatever
+    their method. The server has not acted on those, so even a POST creating
+    an object can safely be sent again.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class GNS3Session(Session):
+    """
+    A requests session that (de)serializes JSON with orjson if available.
+    GET responses carrying an ETag are remembered, and later GETs of the same
+    URL are made conditional, so unchanged listings come back as an empty
+    304 response.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._etag_cache = {}
+
+    def request(self, method, url, *args, json=None, **kwargs):
+        if json is not None:
+            kwargs["data"] = json_dumps(json)
+
+        cached = self._etag_cache.get(url) if method == "GET" else None
+        if cached is not None:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), "If-None-Match": cached[0]}
+
+        response = super().request(method, url, *args, **kwargs)
+
+        if cached is not None and response.status_code == 304:
+            return cached[1]
+
+        response.json = lambda **_: self._decode_json(response)
+
+        if method == "GET" and response.status_code == 200 and "ETag" in response.headers:
+            self._etag_cache[url] = (response.headers["ETag"], response)
+
+        return response
+
+    @staticmethod
+    def _decode_json(response):
+        """
+        Decode a JSON response body, raising the same exception as requests
+        does for an invalid body, e.g. an HTML error page from a proxy.
+        """
+        try:
+            return json_loads(response.content)
+        except json.JSONDecodeError as err:
+            raise RequestsJSONDecodeError(err.msg, err.doc, err.pos) from err
+        except ValueError as err:
+            raise RequestsJSONDecodeError(str(err), response.text, 0) from err
 
 
 def create_project(name):
@@ -38,88 +129,165 @@ def create_project(name):
 
     # Finding the project ID if a project with the given name exists.
     try:
-        url = f"{CONFIG["gns3_server_url"]}/v2/projects"
+        projects_url = f"{CONFIG["gns3_server_url"]}/v2/projects"
     except KeyError:
-        print(
-            "Please specify the GNS3 server URL either in the configuration file or on the command line",
-            file=sys.stderr
-        )
-        exit(1)
+        raise GNS3Error(
+            "Please specify the GNS3 server URL either in the configuration file or on the command line"
+        ) from None
 
-    response = get(url)
+    response = SESSION.get(projects_url)
     if response.status_code == 200:
         body = response.json()
         project = next((item for item in body if item["name"] == CONFIG["project_name"]), None)
     else:
-        log.error(
+        raise GNS3Error(
             "Received HTTP error %d when checking if the project already exists! Exiting.",
             response.status_code
         )
-        exit(1)
 
     # Deleting the project if it already exists.
     if project is not None:
-        delete_project_id = project["project_id"]
-        url = f"{CONFIG["gns3_server_url"]}/v2/projects/{delete_project_id}"
-
-        response = delete(url)
+        response = SESSION.delete(f"{projects_url}/{project["project_id"]}")
         if response.status_code != 204:
-            log.error(
+            raise GNS3Error(
                 "Received HTTP error %d when deleting the existing project! Exiting.",
                 response.status_code
             )
-            exit(1)
 
     # (Re)creating the project
-    url = f"{CONFIG["gns3_server_url"]}/v2/projects"
     data = {
         "name": name
     }
 
-    response = post(url, data=dumps(data))
+    response = SESSION.post(projects_url, json=data)
     if response.status_code == 201:
         body = response.json()
         # Adding the project ID to the config
         CONFIG["project_id"] = body["project_id"]
     else:
-        log.error(
+        raise GNS3Error(
             "Received HTTP error %d when creating the project! Exiting.",
             response.status_code
         )
-        exit(1)
 
 
-def assign_template_ids():
+_template_cache_file = os.path.expanduser("~/.cache/gns3_templates.json")
+_template_cache_ttl = 600
+
+
+def _load_template_cache():
     """
-    Retrieve template information and assign the template IDs to the node
-    definitions. The template ID is required when creating nodes from templates.
+    Read the template cache file, returning an empty cache if it is missing,
+    unreadable or malformed.
     """
+    try:
+        with open(_template_cache_file, encoding="UTF-8") as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
 
-    url = f"{CONFIG["gns3_server_url"]}/v2/templates"
-    response = get(url)
+    return cache if isinstance(cache, dict) else {}
 
-    templates = {}
+
+def _save_template_cache(cache):
+    """
+    Write the template cache file. Failing to do so is not fatal.
+    """
+    try:
+        os.makedirs(os.path.dirname(_template_cache_file), exist_ok=True)
+        with open(_template_cache_file, "w", encoding="UTF-8") as cache_file:
+            json.dump(cache, cache_file)
+    except OSError as err:
+        log.debug("Unable to write template cache: %s", err)
+
+
+def get_templates(server_url, refresh=False):
+    """
+    Return a mapping of template names to template IDs for the given GNS3
+    server, and whether it has been taken from the cache. The mapping is
+    cached on disk for a few minutes, so repeated runs do not need to query
+    the server again.
+    """
+
+    cache = _load_template_cache()
+
+    if not refresh:
+        # A malformed cache entry is treated like a missing one
+        try:
+            entry = cache[server_url]
+            if time() - entry["timestamp"] < _template_cache_ttl:
+                templates = dict(entry["templates"])
+                log.debug("Using cached templates for %s", server_url)
+                return templates, True
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    url = f"{server_url}/v2/templates"
+    response = SESSION.get(url)
 
     if response.status_code != 200:
-        log.error(
+        raise GNS3Error(
             "Received HTTP error %d when retrieving templates! Exiting.",
             response.status_code
         )
-        exit(1)
 
     body = response.json()
     templates = { t["name"]: t["template_id"] for t in body }
 
+    cache[server_url] = {"timestamp": time(), "templates": templates}
+    _save_template_cache(cache)
+
+    return templates, False
+
+
+def assign_template_ids(refresh=False):
+    """
+    Retrieve template information and assign the template IDs to the node
+    definitions. The template ID is required when creating nodes from templates.
+    Returns whether the template IDs have been taken from the cache.
+    """
+
+    templates, cached = get_templates(CONFIG["gns3_server_url"], refresh)
+
+    # The cached templates may predate templates imported since
+    if cached and any(n["template_name"] not in templates for n in CONFIG["nodes"].values()):
+        templates, cached = get_templates(CONFIG["gns3_server_url"], refresh=True)
+
     for node_name in CONFIG["nodes"]:
         node_config = CONFIG["nodes"][node_name]
         try:
             node_config["template_id"] = templates[node_config["template_name"]]
         except KeyError:
-            log.error(
+            raise GNS3Error(
                 "No template '%s' found on server.",
                 node_config["template_name"]
-            )
-            exit(1)
+            ) from None
+
+    return cached
+
+
+_fresh_templates = {}
+_fresh_templates_lock = Lock()
+
+
+def fresh_template_id(template_name):
+    """
+    Return the current ID of a template, retrieving the templates from the
+    server at most once per run. Used when a cached template ID turned out
+    to be stale.
+    """
+    with _fresh_templates_lock:
+        if not _fresh_templates:
+            templates, _ = get_templates(CONFIG["gns3_server_url"], refresh=True)
+            _fresh_templates.update(templates)
+
+    try:
+        return _fresh_templates[template_name]
+    except KeyError:
+        raise GNS3Error(
+            "No template '%s' found on server.",
+            template_name
+        ) from None
 
 _network_config_tpl = """## template: jinja
 network:
@@ -159,167 +327,241 @@ local-hostname: {{ node_name }}
 
 """
 
-def create_cloud_config(node_name):
+def create_cloud_config(node_name, node_config, defaults, genisoimage=None):
     """
     Create cloud config files, i.e. the cloud-init configuration and an iso
-    image containing those files.
+    image containing those files. The image is built with the genisoimage
+    binary if its path is given, otherwise in memory with pycdlib, and
+    returned as bytes. All input is passed explicitly, so this can run in a
+    worker process.
     """
     log.debug("Creating cloud config for %s", node_name)
-    tmpdir = tempfile.mkdtemp()
-    log.debug("Created temporary directory '%s' for %s", tmpdir, node_name)
 
     tpl_data = {
         "node_name": node_name,
-        "node_config": CONFIG["nodes"][node_name],
-        "defaults": CONFIG["defaults"],
+        "node_config": node_config,
+        "defaults": defaults,
     }
 
-    network_config = f"{tmpdir}/network-config"
-    with open(network_config, "w") as conffile:
-        nctpl = Template(_network_config_tpl)
-        conffile.write(nctpl.render(tpl_data))
+    files = {
+        "/network-config": Template(_network_config_tpl).render(tpl_data).encode(),
+        "/user-data": Template(_user_data_tpl).render(tpl_data).encode(),
+        "/meta-data": Template(_meta_data_tpl).render(tpl_data).encode(),
+    }
 
-    user_config = f"{tmpdir}/user-data"
-    with open(user_config, "w") as conffile:
-        udtpl = Template(_user_data_tpl)
-        conffile.write(udtpl.render(tpl_data))
+    log.debug("Create cloud-init iso for %s", node_name)
+    if genisoimage is not None:
+        return _create_iso_genisoimage(genisoimage, node_name, files)
 
-    meta_data = f"{tmpdir}/meta-data"
-    with open(meta_data, "w") as conffile:
-        udtpl = Template(_meta_data_tpl)
-        conffile.write(udtpl.render(tpl_data))
+    if pycdlib is None:
+        raise GNS3Error(
+            "Neither genisoimage nor pycdlib is available to create the cloud-init image for %s",
+            node_name
+        )
 
-    iso_name = f"{tmpdir}/{node_name}.iso"
-    log.debug("Create cloud-init iso for %s: '%s'", node_name, iso_name)
     iso = pycdlib.PyCdlib()
     iso.new(vol_ident='cidata', joliet=3, rock_ridge="1.09")
-    iso.add_file(network_config, joliet_path="/network-config")
-    iso.add_file(user_config, joliet_path="/user-data")
-    iso.add_file(meta_data, joliet_path="/meta-data")
-    iso.write(iso_name)
+    for path, content in files.items():
+        iso.add_fp(BytesIO(content), len(content), joliet_path=path)
+
+    iso_image = BytesIO()
+    iso.write_fp(iso_image)
     iso.close()
 
-    # ensure the stuff gets deleted when the program exits
-    atexit.register(shutil.rmtree, tmpdir)
+    return iso_image.getvalue()
+
+def _create_iso_genisoimage(genisoimage, node_name, files):
+    """
+    Create the cloud-init iso image with genisoimage, which is a lot faster
+    than building it with pycdlib. The image is returned as bytes.
+    """
+    with TemporaryDirectory() as tmpdir:
+        for path, content in files.items():
+            with open(f"{tmpdir}{path}", "wb") as conffile:
+                conffile.write(content)
+
+        result = run(
+            [
+                genisoimage, "-quiet", "-input-charset", "utf-8",
+                "-V", "cidata", "-J", "-r", tmpdir
+            ],
+            stdout=PIPE,
+            stderr=PIPE,
+            check=False
+        )
+
+    if result.returncode != 0:
+        raise GNS3Error(
+            "genisoimage failed to create the cloud-init image for %s: %s",
+            node_name,
+            result.stderr.decode().strip()
+        )
 
-    return iso_name
+    return result.stdout
 
-def add_nodes():
+def add_node(node_name, node_config, iso_image=None, templates_cached=False):
     """
-    This function adds the defined nodes to the project.
+    Create a single node from its template and, if given, attach a
+    cloud-init image to it. The node configuration is updated in place.
     """
 
-    # Add each node individually
-    for node_name in CONFIG["nodes"]:
-        node_config = CONFIG["nodes"][node_name]
+    log.debug(
+        "Node configuration for \"%s\": \"%s\"",
+        node_name,
+        node_config
+    )
+
+    project_url = f"{CONFIG["gns3_server_url"]}/v2/projects/{CONFIG["project_id"]}"
+    url = f"{project_url}/templates/{node_config["template_id"]}"
+    data = {
+        "compute_id": "local",
+        "name": node_name,
+        "x": node_config["x"],
+        "y": node_config["y"]
+    }
+
+    log.debug("Creating node %s with data: \"%s\"", node_name, data)
+    # Create the node
+    response = SESSION.post(url, json=data)
+
+    # A cached template ID is stale if the template has been re-imported
+    # since, so retry once with the current ID
+    if response.status_code == 404 and templates_cached:
+        log.info("Template ID for node %s is outdated, retrying with the current one", node_name)
+        node_config["template_id"] = fresh_template_id(node_config["template_name"])
+        response = SESSION.post(f"{project_url}/templates/{node_config["template_id"]}", json=data)
 
-        log.debug(
-            "Node configuration for \"%s\": \"%s\"",
+    instance_data = response.json()
+    log.debug("Response: \"%s\"", instance_data)
+
+    if response.status_code != 201:
+        raise GNS3Error(
+            "Received HTTP error %d when adding node %s: \"%s\"",
+            response.status_code,
             node_name,
-            node_config
+            instance_data["message"]
+        )
+
+    # Update node configuration with returned details
+    node_config["console"] = instance_data["console"]
+    node_config["node_id"] = instance_data["node_id"]
+    node_config["ports"] = instance_data["ports"]
+    node_config["node_directory"] = instance_data["node_directory"]
+    node_url = f"{project_url}/nodes/{instance_data["node_id"]}"
+
+    if iso_image is not None:
+        log.debug("Uploading cloud-init ISO image for node %s: ", node_name)
+        response = SESSION.post(
+            f"{node_url}/files/cloud-init.iso",
+            data=iso_image,
+            headers={"Content-Type": "application/octet-stream"}
         )
 
-        url = f"{CONFIG["gns3_server_url"]}/v2/projects/{CONFIG["project_id"]}/templates/{node_config["template_id"]}"
+        if response.status_code != 201:
+            raise GNS3Error(
+                "Received HTTP error %d when uploading cloud-init image for node %s: \"%s\"",
+                response.status_code,
+                node_name,
+                response.text
+            )
+
+        # The template endpoint does not accept node properties on creation
+        # and the image path depends on the node directory, so the image can
+        # only be attached afterwards. Only send the changed property.
+        log.debug("Configuring cloud-init ISO image for node %s: ", node_name)
         data = {
-            "compute_id": "local",
-            "name": node_name,
-            "x": node_config["x"],
-            "y": node_config["y"]
+            "properties": {
+                "cdrom_image": f"{node_config["node_directory"]}/cloud-init.iso"
+            }
         }
 
-        log.debug("Creating node %s with data: \"%s\"", node_name, data)
-        # Create the node
-        response = post(url, data=dumps(data))
-        log.debug("Response: \"%s\"", response.json())
+        response = SESSION.put(node_url, json=data)
 
-        if response.status_code != 201:
-            log.error(
-                "Received HTTP error %d when adding node %s: \"%s\"",
+        if response.status_code != 200:
+            raise GNS3Error(
+                "Received HTTP error %d when configuring cloud-init image for node %s: \"%s\"",
                 response.status_code,
                 node_name,
                 response.json()["message"]
             )
-            exit(1)
-
-        # Update node configuration with returned details
-        instance_data = response.json()
-        node_config["console"] = instance_data["console"]
-        node_config["node_id"] = instance_data["node_id"]
-        node_config["ports"] = instance_data["ports"]
-        node_config["node_directory"] = instance_data["node_directory"]
-
-        if 'cloud_init' in node_config:
-            iso_name = create_cloud_config(node_name)
-
-            log.debug("Uploading cloud-init ISO image for node %s: ", node_name)
-            url = f"{CONFIG["gns3_server_url"]}/v2/projects/{CONFIG["project_id"]}/nodes/{node_config["node_id"]}/files/cloud-init.iso"
-            with open(iso_name, 'rb') as iso_file:
-                response = post(url, data=iso_file)
-
-                if response.status_code != 201:
-                    log.error(
-                        "Received HTTP error %d when uploading cloud-init image for node %s: \"%s\"",
-                        response.status_code,
-                        node_name,
-                        response.text
-                    )
-                    exit(1)
-
-
-            log.debug("Configuring cloud-init ISO image for node %s: ", node_name)
-            data["properties"] = {
-                "cdrom_image": f"{node_config["node_directory"]}/cloud-init.iso"
-            }
 
-            url = f"{CONFIG["gns3_server_url"]}/v2/projects/{CONFIG["project_id"]}/nodes/{node_config["node_id"]}"
-            response = put(url, data=dumps(data))
+    log.debug(
+        "Updated node configuration for \"%s\": \"%s\"",
+        node_name,
+        node_config
+    )
 
-            if response.status_code != 200:
-                log.error(
-                    "Received HTTP error %d when configuring cloud-init image for node %s: \"%s\"",
-                    response.status_code,
-                    node_name,
-                    response.json()["message"]
-                )
-                exit(1)
 
-        log.debug(
-            "Updated node configuration for \"%s\": \"%s\"",
-            node_name,
-            node_config
-        )
+def add_nodes(parallelism=8, templates_cached=False):
+    """
+    This function adds the defined nodes to the project.
+    """
+
+    nodes = CONFIG["nodes"]
+    iso_images = {}
+
+    # Build the cloud-init images before creating the nodes. genisoimage does
+    # the work in a child process, so threads suffice to run it concurrently.
+    # Building them with pycdlib is CPU bound, hence use separate processes.
+    cloud_init_nodes = [name for name, config in nodes.items() if 'cloud_init' in config]
+    if cloud_init_nodes:
+        genisoimage = shutil.which("genisoimage")
+        if genisoimage is not None:
+            executor = ThreadPoolExecutor(
+                max_workers=min(len(cloud_init_nodes), parallelism)
+            )
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=min(len(cloud_init_nodes), os.cpu_count() or 1)
+            )
+
+        with executor:
+            iso_images = dict(zip(cloud_init_nodes, executor.map(
+                create_cloud_config,
+                cloud_init_nodes,
+                [nodes[name] for name in cloud_init_nodes],
+                repeat(CONFIG.get("defaults", {})),
+                repeat(genisoimage)
+            )))
 
+    # Nodes are independent of each other, hence create them concurrently
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        list(executor.map(
+            lambda node: add_node(*node, iso_images.get(node[0]), templates_cached),
+            nodes.items()
+        ))
 
-def add_links():
+
+def add_links(parallelism=8):
     """
     Create links between the nodes
     """
 
-    for link in CONFIG["links"]:
+    nodes = CONFIG["nodes"]
+    links = CONFIG["links"]
+    payloads = []
+
+    for link in links:
 
         # Add port details to links
         for member in link:
-            log.debug(CONFIG["nodes"])
             log.debug("Member name: %s", member["name"])
 
-
             try:
-                node = CONFIG["nodes"][member["name"]]
+                node = nodes[member["name"]]
             except KeyError:
-                log.error(
+                raise GNS3Error(
                     "Node \"%s\" defined in link \"%s\"does not exist.",
                     member["name"],
                     link
-                )
-                exit(1)
+                ) from None
 
+            port = node["ports"][member["interface"]]
             member["node_id"] = node["node_id"]
-            member["adapter_number"] = node["ports"][member["interface"]]["adapter_number"]
-            member["port_number"] = node["ports"][member["interface"]]["port_number"]
-
-        url = f"{CONFIG["gns3_server_url"]}/v2/projects/{CONFIG["project_id"]}/links"
+            member["adapter_number"] = port["adapter_number"]
+            member["port_number"] = port["port_number"]
 
-        data = {
+        payloads.append({
             "nodes": [
                {
                    "node_id": link[0]["node_id"],
@@ -332,95 +574,136 @@ def add_links():
                    "port_number": link[1]["port_number"]
                }
             ]
-        }
+        })
+
+    url = f"{CONFIG["gns3_server_url"]}/v2/projects/{CONFIG["project_id"]}/links"
 
-        response = post(url, data=dumps(data))
+    # Links are independent of each other, hence create them concurrently
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        responses = list(executor.map(lambda data: SESSION.post(url, json=data), payloads))
+
+    for link, response in zip(links, responses):
         if response.status_code != 201:
-            log.error(
+            raise GNS3Error(
                 "Error %d when creating link %s adapter %s port %s -- %s adapter %s port %s",
                 response.status_code,
                 link[0]["node_id"], link[0]["adapter_number"], link[0]["port_number"],
                 link[1]["node_id"], link[1]["adapter_number"], link[1]["port_number"]
             )
-            exit(1)
 
 
 def start_nodes():
     """
     Booting all nodes in the topology.
     """
-    url = f"{CONFIG["gns3_server_url"]}/v2/projects/{CONFIG["project_id"]}/nodes/start"
+    nodes_url = f"{CONFIG["gns3_server_url"]}/v2/projects/{CONFIG["project_id"]}/nodes"
 
-    response = post(url)
-    if response.status_code == 204:
-        # Wait 10s for nodes to start booting
-        sleep(10)
-    else:
-        log.error(
+    response = SESSION.post(f"{nodes_url}/start")
+    if response.status_code != 204:
+        raise GNS3Error(
             "Received HTTP error %d when starting nodes! Exiting.",
             response.status_code
         )
-        exit(1)
+
+    # Wait for all nodes to report that they have started, backing off
+    # between polls
+    deadline = time() + 60
+    delay = 0.25
+
+    while time() < deadline:
+        sleep(delay)
+        response = SESSION.get(nodes_url)
+        if response.status_code == 200 and all(n["status"] == "started" for n in response.json()):
+            return
+        delay = min(delay * 2, 2)
+
+    log.warning("Not all nodes reported to be started after 60 seconds.")
 
 
-def day0_config():
+def day0_config(max_workers=8):
     """
     Deploying Day-0 configuration
     """
 
     gns3_server, _ = urlparse(CONFIG["gns3_server_url"]).netloc.split(':')
 
+    expect_cmds = {}
     for node_name, config in CONFIG["nodes"].items():
         if "cmdfile" in config:
-            expect_cmd = [
+            expect_cmds[node_name] = [
                 "expect",
                 f"day0-{config["cmdfile"]}.exp",
                 gns3_server,
                 str(config["console"]),
                 node_name,
                 config["ip"],
-                config["gw"],
-                ">/dev/null"
+                config["gw"]
             ]
-            call(expect_cmd)
+
+    # The devices are configured independently, hence run the Expect
+    # scripts concurrently
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda expect_cmd: run(expect_cmd, stdout=DEVNULL, stderr=DEVNULL),
+            expect_cmds.values()
+        ))
+
+    for node_name, result in zip(expect_cmds, results):
+        if result.returncode != 0:
+            log.warning(
+                "Day-0 configuration of node %s failed with exit code %d.",
+                node_name,
+                result.returncode
+            )
 
 
+# Removes the /xx or " xxx.xxx.xxx.xxx" portion of an address
+_ip_suffix_re = re_compile("/.*$| .*$")
+
 def build_ansible_hosts(fh):
     """
     Creating an Ansible hosts file from the nodes
     """
 
-    with fh as hosts_file:
-        ansible_groups = {}
+    ansible_groups = {}
+    inventory = []
 
-        for node, config in CONFIG["nodes"].items():
-            if not "ip" in config:
-                continue
+    for node, config in CONFIG["nodes"].items():
+        if not "ip" in config:
+            continue
 
-            # Writing the hostname and its IP address to the inventory
-            # file. The sub function removes the /xx or
-            # "xxx.xxx.xxx.xxx" portion of the address.
-            hosts_file.write(
-                f"{node} ansible_host={sub("/.*$| .*$", "", config["ip"])}\n"
-            )
+        # Writing the hostname and its IP address to the inventory
+        # file without the netmask.
+        inventory.append(
+            f"{node} ansible_host={_ip_suffix_re.sub("", config["ip"])}\n"
+        )
+
+        for group in config.get("groups", []):
+            ansible_groups.setdefault(group, []).append(node)
+
+    log.debug("Gathered groups: %s", ansible_groups)
+
+    # Create inventory groups
+    for group, hosts in ansible_groups.items():
+        inventory.append(f"\n[{group}]\n")
+        inventory.extend(f"{host}\n" for host in hosts)
 
-            if not "groups" in config:
-                continue
+    with fh as hosts_file:
+        hosts_file.write("".join(inventory))
 
-            for group in config["groups"]:
-                if group not in ansible_groups:
-                    ansible_groups[group] = [node]
-                else:
-                    ansible_groups[group].append(node)
+def positive_int(value):
+    """
+    Argument type for options expecting a number greater than zero
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
 
-            log.debug("Gathered groups: %s", ansible_groups)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a positive integer")
 
-        # Create inventory groups
-        for group, hosts in ansible_groups.items():
-            hosts_file.write("\n")
-            hosts_file.write(f"[{group}]\n")
-            for host in hosts:
-                hosts_file.write(f"{host}\n")
+    return number
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="""Create a topology on GNS3.""")
@@ -457,6 +740,20 @@ if __name__ == "__main__":
         required=False
     )
 
+    parser.add_argument(
+        "--refresh-templates",
+        action='store_true',
+        default=False,
+        help='Ignore cached template IDs and query the GNS3 server',
+    )
+
+    parser.add_argument(
+        "--max-day0-parallel",
+        type=positive_int,
+        default=8,
+        help='Maximum number of nodes to apply Day-0 configuration to in parallel',
+    )
+
     parser.add_argument(
         "-d",
         dest='debug',
@@ -477,44 +774,80 @@ if __name__ == "__main__":
     with args.config_file as config_file:
         CONFIG = load(config_file, Loader=Loader)
 
-    # overwrite some definitions from the configuration file
-    if args.gns3_server_url:
-        CONFIG["gns3_server_url"] = args.gns3_server_url
-
-    if args.project_name:
-        CONFIG["project_name"] = args.project_name
-
-    # Create project and add its ID to the config
-    log.info("Creating GNS3 project")
-    create_project(CONFIG["project_name"])
-
-    # Add template IDs to the config
-    log.info("Retrieving template IDs")
-    assign_template_ids()
-
-    # Add nodes to the topology
-    log.info("Adding nodes")
-    add_nodes()
-
-    # Create links between the nodes
-    log.info("Adding links")
-    add_links()
-
-    # Creating inventory file for Ansible
-    if args.ansible_hosts:
-        log.info("Generating Ansible inventory file")
-        build_ansible_hosts(args.ansible_hosts)
-
-    # Dump final config
-    if args.output_file:
-        log.info("Saving final topology config.")
-        with args.output_file as topology_file:
-            safe_dump(CONFIG, topology_file, default_flow_style=False)
-
-    # Start nodes
-    log.info("Starting nodes")
-    start_nodes()
+    try:
+        # Number of concurrent workers talking to the GNS3 server
+        parallelism = CONFIG.get("parallelism", 8)
+        if not isinstance(parallelism, int) or parallelism < 1:
+            raise GNS3Error(
+                "The parallelism setting must be a positive integer, not '%s'.",
+                parallelism
+            )
 
-    # Day-0 configuration
-    log.info("Applying Day-0 configuration")
-    day0_config()
+        # Reuse a single connection pool for all calls to the GNS3 server
+        SESSION = GNS3Session()
+        SESSION.headers["Content-Type"] = "application/json"
+        # Retry transient server errors instead of aborting the deployment.
+        # POSTs are only retried on connection errors and 429, as the server may
+        # have created the object despite a gateway error or a dropped response.
+        # The pool must hold a connection for every concurrent worker, and at
+        # least two for creating the project while retrieving the templates.
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(parallelism, 2),
+            max_retries=GNS3Retry(
+                total=5,
+                backoff_factor=0.3,
+                status_forcelist=[429, 502, 503, 504],
+                allowed_methods=frozenset(["GET", "PUT", "DELETE"]),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        )
+        SESSION.mount("http://", adapter)
+        SESSION.mount("https://", adapter)
+
+        # overwrite some definitions from the configuration file
+        if args.gns3_server_url:
+            CONFIG["gns3_server_url"] = args.gns3_server_url
+
+        if args.project_name:
+            CONFIG["project_name"] = args.project_name
+
+        # Create project and add its ID to the config. At the same time, add
+        # template IDs to the config, as this does not depend on the project.
+        log.info("Creating GNS3 project and retrieving template IDs")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            project = executor.submit(create_project, CONFIG["project_name"])
+            templates = executor.submit(assign_template_ids, args.refresh_templates)
+            project.result()
+            templates_cached = templates.result()
+
+        # Add nodes to the topology
+        log.info("Adding nodes")
+        add_nodes(parallelism, templates_cached)
+
+        # Create links between the nodes
+        log.info("Adding links")
+        add_links(parallelism)
+
+        # Creating inventory file for Ansible
+        if args.ansible_hosts:
+            log.info("Generating Ansible inventory file")
+            build_ansible_hosts(args.ansible_hosts)
+
+        # Dump final config
+        if args.output_file:
+            log.info("Saving final topology config.")
+            with args.output_file as topology_file:
+                safe_dump(CONFIG, topology_file, default_flow_style=False)
+
+        # Start nodes
+        log.info("Starting nodes")
+        start_nodes()
+
+        # Day-0 configuration
+        log.info("Applying Day-0 configuration")
+        day0_config(args.max_day0_parallel)
+    except (GNS3Error, RequestException) as err:
+        log.error("%s", err)
+        sys.exit(1)